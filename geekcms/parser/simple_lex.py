@@ -1,7 +1,7 @@
 import os
 import re
 from ply import lex
-from .utils import ErrorCollector
+from .utils import ErrorBag
 
 
 tokens = (
@@ -34,7 +34,7 @@ t_ignore_COMMENT = r'\#.*'
 
 def t_error(t):
     # print("Illegal Character: '{}' in line {}".format(t.value[0], t.lineno))
-    ErrorCollector.add_lex_message(
+    t.lexer.error_bag.add_lex_message(
         (t.value[0], t.lineno),
     )
     t.lexer.skip(1)
@@ -45,3 +45,5 @@ lexer = lex.lex(
     reflags=re.ASCII,
     outputdir=os.path.dirname(__file__),
 )
+# replaced by SequenceParser for every analysis.
+lexer.error_bag = ErrorBag()
@@ -1,9 +1,9 @@
 import os
 from ply import yacc
 from .simple_lex import tokens
+from .simple_lex import lexer
 from .utils import PluginRel
 from .utils import PluginExpr
-from .utils import ErrorCollector
 
 
 def p_start(p):
@@ -45,29 +45,41 @@ def p_line_atom(p):
     p[0] = p[1]
 
 
+def _to_left_rel(expr):
+    # transform 'x p>> y' to 'y <<p x'.
+    relation = expr.relation
+    if relation.is_left_rel:
+        return expr
+    return expr._replace(
+        left_operand=expr.right_operand,
+        right_operand=expr.left_operand,
+        relation=relation._replace(is_left_rel=True),
+    )
+
+
 def p_plugin_expr_binary(p):
     'plugin_expr : plugin_name relation plugin_name'
-    p[0] = PluginExpr(
+    p[0] = _to_left_rel(PluginExpr(
         left_operand=p[1],
         relation=p[2],
         right_operand=p[3],
-    )
+    ))
 
 
 def p_plugin_expr_left(p):
     'plugin_expr : plugin_name relation'
-    p[0] = PluginExpr(
+    p[0] = _to_left_rel(PluginExpr(
         left_operand=p[1],
         relation=p[2],
-    )
+    ))
 
 
 def p_plugin_expr_right(p):
     'plugin_expr : relation plugin_name'
-    p[0] = PluginExpr(
+    p[0] = _to_left_rel(PluginExpr(
         relation=p[1],
         right_operand=p[2],
-    )
+    ))
 
 
 def p_plugin_expr_none(p):
@@ -115,10 +127,18 @@ def p_empty(p):
 
 
 def p_error(p):
+    # p is None at the end of input, so the lexer is taken from the parser.
+    lexer = parser.lexer
+    if p is None:
+        lexer.error_bag.add_yacc_message(
+            ('[EOL]', lexer.lineno, '[EOL]'),
+        )
+        return
+
     # print("Syntax Error: '{}' in line {}".format(p.value, p.lineno))
     discard = [p.value]
     while True:
-        token = yacc.token()
+        token = parser.token()
         if token and token.type != 'NEWLINE':
             discard.append(token.value)
             continue
@@ -127,10 +147,10 @@ def p_error(p):
             discard.append(val)
             break
     # print('Discard: ', ''.join(discard))
-    ErrorCollector.add_yacc_message(
+    lexer.error_bag.add_yacc_message(
         (p.value, p.lineno, ''.join(discard)),
     )
-    yacc.restart()
+    parser.restart()
 
 
 parser = yacc.yacc(
@@ -138,3 +158,5 @@ parser = yacc.yacc(
     optimize=1,
     outputdir=os.path.dirname(__file__),
 )
+# replaced by SequenceParser for every analysis.
+parser.lexer = lexer
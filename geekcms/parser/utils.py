@@ -1,27 +1,32 @@
+from collections import namedtuple
 
 
-class PluginRel:
+class PluginRel(namedtuple('PluginRel', 'is_left_rel degree')):
 
-    def __init__(self, is_left_rel, degree):
-        self.is_left_rel = is_left_rel
-        self.degree = degree
+    __slots__ = ()
 
     def __repr__(self):
         return 'PluginRel({}, {})'.format(self.is_left_rel, self.degree)
 
 
-class PluginExpr:
+class PluginExpr(namedtuple('PluginExpr',
+                            'left_operand right_operand relation')):
+
+    __slots__ = ()
 
     HEAD = 'HEAD'
     TAIL = 'TAIL'
 
-    def __init__(self, *,
-                 left_operand=None, right_operand=None, relation=None):
+    def __new__(cls,
+                left_operand=None, right_operand=None, relation=None):
         # HEAD and TAIL are set for None value.
-        self.left_operand = left_operand or self.HEAD
-        self.right_operand = right_operand or self.TAIL
         # if rel is None, which means the expression's order is not defined.
-        self.relation = relation
+        return super().__new__(
+            cls,
+            left_operand or cls.HEAD,
+            right_operand or cls.TAIL,
+            relation,
+        )
 
     def __repr__(self):
         text = '<PluginExpr left: {}, right: {}, is_left_rel: {}>'.format(
@@ -32,71 +37,17 @@ class PluginExpr:
         return text
 
 
-class _ContainerError:
-
-    def __init__(self, name):
-        self._name = name
-
-    def __get__(self, instance, cls):
-        container_name = cls._get_message_container(self._name)
-        container = getattr(cls, container_name)
-        return bool(container)
-
-
-class ErrorCollector:
-
-    lex_error = _ContainerError('lex')
-    yacc_error = _ContainerError('yacc')
-
-    theme_lex_error = {}
-    theme_yacc_error = {}
-    _lex_message_container = []
-    _yacc_message_container = []
-
-    @classmethod
-    def _get_message_container(cls, name):
-        attr = '_{}_message_container'.format(name)
-        return attr
-
-    @classmethod
-    def _get_theme_error_mapping(cls, name):
-        attr = 'theme_{}_error'.format(name)
-        return attr
-
-    @classmethod
-    def _clean_up(cls, name):
-        attr = cls._get_message_container(name)
-        setattr(cls, attr, list())
-
-    @classmethod
-    def _add_message(cls, name, message):
-        attr = cls._get_message_container(name)
-        getattr(cls, attr).append(message)
-
-    @classmethod
-    def add_lex_message(cls, message):
-        cls._add_message('lex', message)
+class ErrorBag:
 
-    @classmethod
-    def add_yacc_message(cls, message):
-        cls._add_message('yacc', message)
+    def __init__(self):
+        self.lex_messages = []
+        self.yacc_messages = []
 
-    @classmethod
-    def _archive(cls, name, theme):
-        # resolve name.
-        mapping_name = cls._get_theme_error_mapping(name)
-        container_name = cls._get_message_container(name)
-        # get obj.
-        mapping = getattr(cls, mapping_name)
-        container = getattr(cls, container_name)
-        # archive and clean up.
-        mapping[theme] = container
-        cls._clean_up(name)
+    def __bool__(self):
+        return bool(self.lex_messages or self.yacc_messages)
 
-    @classmethod
-    def archive_yacc_messages(cls, theme):
-        cls._archive('yacc', theme)
+    def add_lex_message(self, message):
+        self.lex_messages.append(message)
 
-    @classmethod
-    def archive_lex_messages(cls, theme):
-        cls._archive('lex', theme)
+    def add_yacc_message(self, message):
+        self.yacc_messages.append(message)
@@ -22,12 +22,15 @@ class PluginIndex:
         self.theme_name = theme_name
         self.plugin_name = plugin_name
         self.unique_key = '{}.{}'.format(theme_name, plugin_name)
+        # computed once, used by dict and set lookups.
+        self._hash = hash(self.unique_key)
 
     def __hash__(self):
-        return self.unique_key.__hash__()
+        return self._hash
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
+        # compare keys directly, other could be 'theme.plugin' as well.
+        return self.unique_key == getattr(other, 'unique_key', other)
 
     def __repr__(self):
         return 'PluginIndex({}, {})'.format(
@@ -58,6 +58,7 @@ Algorithm:
         for example, 'x NEWLINE', the only operand in the expression would be
         considered as the left operand, with no relation and right operand.
         1.4 '<<' is transform to '<<0', and so '>>'.
+        1.5 Transform 'x p>> y' to 'y <<p x'.
     2. Preparation for generating plugin execution order.
         2.1 Transform operand to the form of (theme, plugin), based on
         'theme.plugin'. If 'theme.' part is omitted, then automatically
@@ -66,12 +67,12 @@ Algorithm:
         2.2 Expressions that has left operand with no relation and right
         operand, would be removed and kept in somewhere else. Such expressions
         would not be used to generating relation group(step 3).
-        2.3 Transform 'x p>> y' to 'y <<p x'.
     3. Generate relation groups.
     A relation group: {(x <<p y)| for x, all avaliable (p, y) in expressions}.
-        3.1 Sort expressions(x <<p y) with respect to x's value, then with p's
-        value. Generate raw relation groups. Then sort expressions(x <<p y)
-        with respect to y's value, then with p's value in reversed order.
+        3.1 Group expressions(x <<p y) by x's value, then sort each group with
+        respect to p's value. Generate raw relation groups. Then group
+        expressions(x <<p y) by y's value, then sort each group with respect
+        to p's value in reversed order.
         3.2 For every raw relation groups, tranlate all its relations
         (x <<p1 y1, x <<p2 y2, ..., x <<pn yn) to (x < y1, y1 < y2, ...,
         yn-1 < yn) and (xn <<pn y, xn-1 <<pn-1 y, ..., x1 <<p1 y) to
@@ -83,7 +84,7 @@ Algorithm:
         Output: sequence of plugin execution.
 
         order = a queue
-        left_behind = a set initiated with items removed in 2.3.
+        left_behind = a set initiated with items removed in 2.2.
 
         left_hand_side = the dict of left operands, with index as its key and
         reference count as its value.
@@ -91,14 +92,16 @@ Algorithm:
         left_hand_side.
 
         left_behind = items only in right_hand_side.
-        while left_hand_side:
-            find x in left_hand_side and not in right hand side. If such x not
-            exist, then there must be a syntax error.
-            remove x from left_hand_side.
+        find strongly connected components of relations (x < y) by Tarjan's
+        algorithm. If any component has more than one item, or an item
+        related to itself, then there is a cyclic relation(syntax error).
+        ready = a queue of x in left_hand_side and not in right_hand_side.
+        while ready:
+            pop x from ready, push x to order.
             for y of all relations (x < y):
                 decrease y's reference count by 1.
-                if y's reference count equals to zero, delete y from
-                right_hand_side.
+                if y's reference count equals to zero and y in
+                left_hand_side, push y to ready.
 
         if left_behind is not empty, them push all its items to order.
         return order
@@ -106,98 +109,78 @@ Algorithm:
 """
 
 import inspect
-import functools
 from collections import defaultdict
+from collections import deque
+from itertools import chain
 
 from .parser.simple_lex import lexer
 from .parser.simple_yacc import parser
-from .parser.utils import ErrorCollector
+from .parser.utils import ErrorBag
 from .parser.utils import PluginExpr
 from .parser.utils import PluginRel
 from .protocol import PluginIndex
 
 
 _SPECIAL_DEGREE = -1
+_HEAD_AND_TAIL = frozenset([PluginExpr.HEAD, PluginExpr.TAIL])
 
 
 class _Algorithm:
 
     def __init__(self, exprs):
-        self._exprs = []
-        for container in exprs:
-            self._exprs.extend(container)
-
-    # implement 2.3
-    def _transform_to_left_rel(self):
-        for expr in self._exprs:
-            relation = expr.relation
-            if relation.is_left_rel:
-                continue
-            relation.is_left_rel = True
-            # exchange operand
-            expr.left_operand, expr.right_operand =\
-                expr.right_operand, expr.left_operand
+        self._exprs = list(chain.from_iterable(exprs))
 
     # implement 2.2
     def _remove_irrelevant_exprs(self):
 
+        relevant_exprs = []
         irrelevant_exprs = []
-        for expr in self._exprs[:]:
+        for expr in self._exprs:
             # if expr.relation is None, then expr is so called irrelevant.
             if expr.relation is None:
-                self._exprs.remove(expr)
                 irrelevant_exprs.append(expr)
+            else:
+                relevant_exprs.append(expr)
+        self._exprs = relevant_exprs
         return irrelevant_exprs
 
-    def _yield_group(self, sorted_exprs, op_name):
-        while sorted_exprs:
-            group = []
-            val = getattr(sorted_exprs[0], op_name)
-            while sorted_exprs\
-                    and val == getattr(sorted_exprs[0], op_name):
-                expr = sorted_exprs.pop(0)
-                group.append(expr)
-            yield group
-
-    # implement 3.1.1
-    def _generate_left_relation_group(self, exprs):
-        cmp_key_left = lambda x: (hash(x.left_operand), x.relation.degree)
-        sorted_exprs_left = sorted(exprs, key=cmp_key_left)
-        # group by left operand.
-        for group in self._yield_group(sorted_exprs_left, 'left_operand'):
-            yield group
-
-    # implement 3.1.2
-    def _generate_right_relation_group(self, exprs):
-        cmp_key_right = lambda x: (hash(x.right_operand), x.relation.degree)
-        sorted_exprs_right = sorted(exprs, key=cmp_key_right, reverse=True)
-        # group by right operand.
-        for group in self._yield_group(sorted_exprs_right, 'right_operand'):
-            yield group
-
-    def _break_relation_group(self, relation_group, op_name, special_index):
+    # implement 3.1
+    @staticmethod
+    def _generate_relation_groups(exprs):
+        # group by left operand and by right operand in one pass.
+        left_groups = defaultdict(list)
+        right_groups = defaultdict(list)
+        has_degree = False
+        for expr in exprs:
+            left_groups[expr.left_operand].append(expr)
+            right_groups[expr.right_operand].append(expr)
+            has_degree = has_degree or expr.relation.degree != 0
+
+        # sorting is stable, if all degrees are 0 then groups stay as they
+        # are.
+        if has_degree:
+            cmp_key = lambda x: x.relation.degree
+            for group in left_groups.values():
+                group.sort(key=cmp_key)
+            for group in right_groups.values():
+                group.sort(key=cmp_key, reverse=True)
+
+        return left_groups.values(), right_groups.values()
+
+    @staticmethod
+    def _break_relation_group(relation_group, op_name, special_index):
         """
         op_name is the string of operand NOT to be gathered.
         """
-        new_group = []
         special_rel = PluginRel(True, _SPECIAL_DEGREE)
 
-        last_operand = None
-        for expr in relation_group:
-
-            if last_operand is None:
-                # set up last_operand
-                last_operand = getattr(expr, op_name)
-                continue
-
-            combined_expr = PluginExpr(
-                left_operand=last_operand,
-                right_operand=getattr(expr, op_name),
-                relation=special_rel,
-            )
-            new_group.append(combined_expr)
-            # update last_operand
-            last_operand = getattr(expr, op_name)
+        # chain adjacent operands pairwise.
+        operands = [getattr(expr, op_name) for expr in relation_group]
+        new_group = [
+            PluginExpr(left_operand=left, right_operand=right,
+                       relation=special_rel)
+            for left, right in zip(operands, operands[1:])
+        ]
 
         special_expr = relation_group[special_index]
         new_expr = PluginExpr(
@@ -215,70 +198,145 @@ class _Algorithm:
         return new_group
 
     # implement 3.2.1
-    def _break_left_relation_group(self, relation_group):
-        return self._break_relation_group(relation_group, 'right_operand', 0)
+    @staticmethod
+    def _break_left_relation_group(relation_group):
+        return _Algorithm._break_relation_group(
+            relation_group, 'right_operand', 0,
+        )
 
     # implement 3.2.2
-    def _break_right_relation_group(self, relation_group):
-        return self._break_relation_group(relation_group, 'left_operand', -1)
+    @staticmethod
+    def _break_right_relation_group(relation_group):
+        return _Algorithm._break_relation_group(
+            relation_group, 'left_operand', -1,
+        )
+
+    @staticmethod
+    def _find_cycles(graph):
+        """
+        Iterative Tarjan's algorithm. graph maps an item to the list of items
+        related to it. Returns strongly connected components that form cycles.
+        """
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        cycles = []
+
+        for root in graph:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph[root]))]
+
+            while work:
+                item, successors = work[-1]
+                for successor in successors:
+                    if successor not in index:
+                        # descend into successor.
+                        index[successor] = lowlink[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append(
+                            (successor, iter(graph.get(successor, ()))),
+                        )
+                        break
+                    elif successor in on_stack:
+                        lowlink[item] = min(lowlink[item], index[successor])
+                else:
+                    # all successors visited.
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[item])
+                    if lowlink[item] != index[item]:
+                        continue
+                    # item is the root of a component.
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.append(member)
+                        if member == item:
+                            break
+                    if len(component) > 1 or item in graph.get(item, ()):
+                        component.reverse()
+                        cycles.append(component)
+
+        return cycles
 
     # implement 4 and 5
     def _generate_execution_order(self, relations, irrelevant_exprs):
         order = []
         left_behind = {expr.left_operand for expr in irrelevant_exprs}
 
-        left_hand_side = defaultdict(list)
+        # map left operand to the bound append of its list, so that append
+        # is not looked up for every relation.
+        appenders = defaultdict(lambda: [].append)
         right_hand_side = defaultdict(int)
         for expr in relations:
-            left_hand_side[expr.left_operand].append(expr.right_operand)
+            appenders[expr.left_operand](expr.right_operand)
             right_hand_side[expr.right_operand] += 1
-
-        items_only_in_right_hand_side =\
-            set(right_hand_side.keys()) - set(left_hand_side.keys())
-        left_behind |= items_only_in_right_hand_side
-
-        while left_hand_side:
-            unique_items =\
-                set(left_hand_side.keys()) - set(right_hand_side.keys())
-
-            if not unique_items:
-                text = "Something Wrong. LHS: '{}' RHS: '{}'"
-                raise SyntaxError(
-                    text.format(dict(left_hand_side), dict(right_hand_side)),
-                )
-
-            item = unique_items.pop()
+        left_hand_side = {
+            left_op: append.__self__ for left_op, append in appenders.items()
+        }
+
+        # keys views support set operations directly.
+        left_behind |= right_hand_side.keys() - left_hand_side.keys()
+
+        cycles = self._find_cycles(left_hand_side)
+        if cycles:
+            text = "Cyclic Relation: {}"
+            raise SyntaxError(text.format('; '.join(
+                ', '.join(index.unique_key for index in cycle)
+                for cycle in cycles
+            )))
+
+        # items with no incoming relation.
+        ready = deque(
+            item for item in left_hand_side if item not in right_hand_side
+        )
+        while ready:
+            item = ready.popleft()
             order.append(item)
 
             for right_op in left_hand_side[item]:
                 right_hand_side[right_op] -= 1
                 if right_hand_side[right_op] == 0:
                     del right_hand_side[right_op]
-            del left_hand_side[item]
+                    if right_op in left_hand_side:
+                        ready.append(right_op)
 
         order.extend(left_behind)
 
         # remove HEAD and TAIL
-        HEAD_AND_TAIL = [PluginExpr.HEAD, PluginExpr.TAIL]
-        for index in order[:]:
-            if index.theme_name is None\
-                    and index.plugin_name in HEAD_AND_TAIL:
-                order.remove(index)
+        order = [
+            index for index in order
+            if not (index.theme_name is None
+                    and index.plugin_name in _HEAD_AND_TAIL)
+        ]
 
         return order
 
     # Mix up all above functions.
     def generate_sequence(self):
         irrelevant_exprs = self._remove_irrelevant_exprs()
-        self._transform_to_left_rel()
+        if not self._exprs:
+            # no relation at all, skip grouping.
+            return self._generate_execution_order([], irrelevant_exprs)
+
+        left_groups, right_groups =\
+            self._generate_relation_groups(self._exprs)
 
         new_relations = []
         # left operand.
-        for relation_group in self._generate_left_relation_group(self._exprs):
+        for relation_group in left_groups:
             new_group = self._break_left_relation_group(relation_group)
             new_relations.extend(new_group)
         # right operand.
-        for relation_group in self._generate_right_relation_group(self._exprs):
+        for relation_group in right_groups:
             new_group = self._break_right_relation_group(relation_group)
             new_relations.extend(new_group)
 
@@ -290,8 +348,18 @@ class SequenceParser:
     def __init__(self):
         self.error = False
         self.theme_plugin_expr_mapping = dict()
-        # bind parser with lexer
-        self._parse = functools.partial(parser.parse, lexer=lexer)
+        self.theme_errors = dict()
+        # each SequenceParser owns its lexer state.
+        self._lexer = lexer.clone()
+
+    def _parse(self, text, error_bag):
+        # error rules reach error_bag through the lexer, p_error reaches the
+        # lexer through the parser.
+        self._lexer.error_bag = error_bag
+        parser.lexer = self._lexer
+        # every call is an independent analysis.
+        self._lexer.lineno = 1
+        return parser.parse(text, lexer=self._lexer)
 
     # implement 2.2
     def _replace_with_plugin_index(self, theme, plugin_exprs):
@@ -309,14 +377,21 @@ class SequenceParser:
             else:
                 raise SyntaxError('Operand Error: {}'.format(operand))
 
+        # operands recur across expressions, resolve each only once.
+        index_cache = {}
+
+        def get_plugin_index(operand):
+            index = index_cache.get(operand)
+            if index is None:
+                index = PluginIndex(*get_theme_plugin(operand))
+                index_cache[operand] = index
+            return index
+
         processed_exprs = []
         for expr in plugin_exprs:
 
-            left_theme, left_plugin = get_theme_plugin(expr.left_operand)
-            right_theme, right_plugin = get_theme_plugin(expr.right_operand)
-
-            left_index = PluginIndex(left_theme, left_plugin)
-            right_index = PluginIndex(right_theme, right_plugin)
+            left_index = get_plugin_index(expr.left_operand)
+            right_index = get_plugin_index(expr.right_operand)
 
             new_expr = PluginExpr(
                 left_operand=left_index,
@@ -327,37 +402,31 @@ class SequenceParser:
 
         return processed_exprs
 
-    def _archive_error(self):
-        if ErrorCollector.lex_error:
-            self.error = True
-            ErrorCollector.archive_lex_messages(theme)
-
-        if ErrorCollector.yacc_error:
-            self.error = True
-            ErrorCollector.archive_yacc_messages(theme)
-
     def analyze(self, theme, text):
-        exprs = self._parse(text)
-        self._archive_error()
+        error_bag = ErrorBag()
+        # nothing is returned if the input ended with a syntax error.
+        exprs = self._parse(text, error_bag) or []
+        if error_bag:
+            self.error = True
+            self.theme_errors[theme] = error_bag
 
         processed_exprs = self._replace_with_plugin_index(theme, exprs)
         self.theme_plugin_expr_mapping[theme] = processed_exprs
 
     def report_error(self):
-        # print lex error
-        for theme, messages in ErrorCollector.theme_lex_error.items():
-            # lineno not really the line number of 'settings' file.
-            # might be improved in the future.
-            val, lineno = messages
-            template = "Theme '{}' >> Illegal Character: '{}' in line {}"
-            print(template.format(theme, val, lineno))
-
-        # print yacc error
-        for theme, messages in ErrorCollector.theme_yacc_error.items():
-            val, lineno, discard = messages
-            template = ("Theme '{}' >> Syntax Error: '{}' in line {}"
-                        "Discard: {}")
-            print(template.format(theme, val, lineno, discard))
+        for theme, error_bag in self.theme_errors.items():
+            # print lex error
+            for val, lineno in error_bag.lex_messages:
+                # lineno not really the line number of 'settings' file.
+                # might be improved in the future.
+                template = "Theme '{}' >> Illegal Character: '{}' in line {}"
+                print(template.format(theme, val, lineno))
+
+            # print yacc error
+            for val, lineno, discard in error_bag.yacc_messages:
+                template = ("Theme '{}' >> Syntax Error: '{}' in line {}"
+                            "Discard: {}")
+                print(template.format(theme, val, lineno, discard))
 
     def generate_sequence(self):
         algorithm = _Algorithm(
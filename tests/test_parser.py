@@ -2,10 +2,13 @@ import unittest
 import os
 import re
 import configparser
+import pickle
 from collections import defaultdict
 
 from geekcms.parser.simple_lex import lexer
 from geekcms.parser.simple_yacc import parser
+from geekcms.parser.utils import PluginExpr
+from geekcms.parser.utils import PluginRel
 from geekcms.protocol import PluginIndex
 from geekcms.sequence_analyze import SequenceParser
 
@@ -15,6 +18,10 @@ class PLYTest(unittest.TestCase):
     def test_parser(self):
         pass
 
+    def test_plugin_expr_pickle(self):
+        expr = PluginExpr(left_operand='a', relation=PluginRel(True, 0))
+        self.assertEqual(pickle.loads(pickle.dumps(expr)), expr)
+
 
 _THEME = 'testtheme'
 
@@ -54,4 +61,56 @@ class SequenceParserTest(unittest.TestCase):
             result = parser.generate_sequence()
             self.assertListEqual(result, suppose_result)
 
+    def test_no_relation(self):
+        parser = SequenceParser()
+        parser.analyze(_THEME, 'a\nb\na')
+        result = parser.generate_sequence()
+        self.assertCountEqual(result, self._get_suppose_result('a, b'))
+
+        parser = SequenceParser()
+        parser.analyze(_THEME, '')
+        self.assertListEqual(parser.generate_sequence(), [])
+
+    def test_error_bag(self):
+        parser = SequenceParser()
+        parser.analyze(_THEME, 'a << b')
+        self.assertFalse(parser.error)
+
+        parser.analyze('errortheme', 'a $ b')
+        self.assertTrue(parser.error)
+        self.assertListEqual(list(parser.theme_errors), ['errortheme'])
+        error_bag = parser.theme_errors['errortheme']
+        self.assertListEqual(error_bag.lex_messages, [('$', 1)])
+        self.assertListEqual(error_bag.yacc_messages, [('b', 1, 'b[EOL]')])
+
+        # syntax error at the end of input.
+        for text in ['<<', '5']:
+            parser = SequenceParser()
+            parser.analyze('errortheme', text)
+            self.assertTrue(parser.error)
+            error_bag = parser.theme_errors['errortheme']
+            self.assertListEqual(error_bag.yacc_messages,
+                                 [('[EOL]', 1, '[EOL]')])
+
+        # line numbers restart for every analysis.
+        parser = SequenceParser()
+        parser.analyze(_THEME, 'a\nb\n')
+        parser.analyze('errortheme', '$')
+        error_bag = parser.theme_errors['errortheme']
+        self.assertListEqual(error_bag.lex_messages, [('$', 1)])
+
+    def test_cycle_error(self):
+        parser = SequenceParser()
+        parser.analyze(_THEME, 'a << b\nb << c\nc << a\nd << e')
+        with self.assertRaises(SyntaxError) as context:
+            parser.generate_sequence()
+        message = str(context.exception)
+        for plugin in ['a', 'b', 'c']:
+            self.assertIn('{}.{}'.format(_THEME, plugin), message)
+        self.assertNotIn('{}.d'.format(_THEME), message)
+
+        parser = SequenceParser()
+        parser.analyze(_THEME, 'a << a')
+        self.assertRaises(SyntaxError, parser.generate_sequence)
+
     #@unittest.expectedFailure